@@ -5,11 +5,17 @@ Main agent file using Google Generative AI with function calling (tool use)
 
 import os
 import json
-from typing import Dict, Any, List
+import time
+import zlib
+from typing import Dict, Any, List, Optional
+import numpy as np
 import google.generativeai as genai
 from google.generativeai.types import FunctionDeclaration, Tool
 from dotenv import load_dotenv
-from tools import TOOL_FUNCTIONS
+from tools import TOOL_FUNCTIONS, get_chapter_list, rank_book_content
+from index_store import get_index_store
+import request_log
+from request_log import AGENT_ERROR_PREFIX
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +47,7 @@ class GitBookAgent:
         self.temperature = temperature
         self.top_p = top_p
         self.top_k = top_k
+        self.tool_functions = TOOL_FUNCTIONS
         
         # Configure API
         api_key = os.getenv('GEMINI_API_KEY')
@@ -119,12 +126,15 @@ Keep responses concise but complete. Use markdown formatting for readability."""
         Returns:
             str: Tool execution result
         """
-        if tool_name in TOOL_FUNCTIONS:
+        if tool_name in self.tool_functions:
+            start = time.perf_counter()
             try:
-                result = TOOL_FUNCTIONS[tool_name](**tool_args)
+                result = self.tool_functions[tool_name](**tool_args)
                 return result
             except Exception as e:
                 return f"Error executing {tool_name}: {str(e)}"
+            finally:
+                request_log.record_tool_call(tool_name, time.perf_counter() - start)
         else:
             return f"Unknown tool: {tool_name}"
     
@@ -185,7 +195,7 @@ Keep responses concise but complete. Use markdown formatting for readability."""
             return response.text
             
         except Exception as e:
-            return f"Error processing message: {str(e)}"
+            return f"{AGENT_ERROR_PREFIX} {str(e)}"
     
     
     def test_agent(self):
@@ -213,13 +223,109 @@ Keep responses concise but complete. Use markdown formatting for readability."""
             print("\n" + "-" * 80)
 
 
+class StubAgent(GitBookAgent):
+    """
+    Offline stand-in for GitBookAgent used for load testing.
+    Never calls Gemini: searches run against the live index with a
+    deterministic pseudo-embedding, and model time is simulated with a
+    sleep. When given a capture log, each known question replays its
+    recorded tool calls (padded to their recorded duration) and model
+    time; other questions take latency_ms.
+    """
+    
+    def __init__(self, capture_path: Optional[str] = None, latency_ms: float = 800.0):
+        """
+        Initialize the stub agent.
+        
+        Args:
+            capture_path (str, optional): Request log to take per-question timings from
+            latency_ms (float): Simulated model time for unknown questions
+        """
+        self.model_name = 'stub'
+        self.latency_ms = latency_ms
+        self.tool_functions = {
+            "search_book_content": self.stub_search,
+            "get_chapter_list": get_chapter_list
+        }
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        
+        if capture_path:
+            with open(capture_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self.profiles[record['question']] = record
+        
+        print(f"✅ Stub agent initialized ({len(self.profiles)} captured questions)")
+    
+    
+    def stub_search(self, query: str) -> str:
+        """
+        Search the live index with a pseudo-embedding derived from the query.
+        
+        Args:
+            query (str): User's question or search query
+            
+        Returns:
+            str: Book content chunks
+        """
+        dimensions = get_index_store().current().embeddings.shape[1]
+        rng = np.random.default_rng(zlib.crc32(query.encode('utf-8')))
+        return rank_book_content(rng.standard_normal(dimensions))
+    
+    
+    def chat(self, user_message: str) -> str:
+        """
+        Simulate answering a user message.
+        
+        Args:
+            user_message (str): User's question or message
+            
+        Returns:
+            str: Stub response
+        """
+        profile = self.profiles.get(user_message)
+        if profile:
+            tool_calls = profile.get('tool_calls', [])
+            model_ms = profile.get('model_ms', self.latency_ms)
+        else:
+            tool_calls = [{"name": "search_book_content", "ms": 0}]
+            model_ms = self.latency_ms
+        
+        for call in tool_calls:
+            tool_name = call['name']
+            tool_args = {"query": user_message} if tool_name == "search_book_content" else {}
+            
+            start = time.perf_counter()
+            result = self.execute_tool(tool_name, tool_args)
+            if result.startswith("Error"):
+                return f"{AGENT_ERROR_PREFIX} {result}"
+            
+            # Pad to the recorded tool time, which includes upstream calls
+            # (e.g. Gemini embeddings) that the stub skips
+            remaining = call.get('ms', 0) / 1000 - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+        
+        time.sleep(model_ms / 1000)
+        return f"[stub] {len(tool_calls)} tool call(s) for: {user_message}"
+
+
 def create_agent() -> GitBookAgent:
     """
     Factory function to create a configured Git Book Agent.
+    Returns a StubAgent instead when AGENT_STUB is set, for load testing.
     
     Returns:
         GitBookAgent: Configured agent instance
     """
+    if os.getenv('AGENT_STUB'):
+        return StubAgent(
+            capture_path=os.getenv('AGENT_STUB_LOG'),
+            latency_ms=float(os.getenv('AGENT_STUB_LATENCY_MS', 800))
+        )
+    
     return GitBookAgent(
         model_name='gemini-2.5-flash',
         temperature=0.3,
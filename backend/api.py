@@ -3,13 +3,17 @@ FastAPI server for Git Book Agent
 Provides REST API endpoints for the chatbot frontend
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
 import os
+import secrets
 from dotenv import load_dotenv
 from agent import create_agent
+from index_store import get_index_store
+import request_log
+from request_log import AGENT_ERROR_PREFIX
 
 # Load environment variables
 load_dotenv()
@@ -44,6 +48,21 @@ async def startup_event():
         print("✅ Agent initialized successfully")
     except Exception as e:
         print(f"❌ Failed to initialize agent: {e}")
+    
+    try:
+        index = get_index_store().current()
+        print(f"✅ Index loaded: {index.version}")
+    except Exception as e:
+        print(f"❌ Failed to load index: {e}")
+    
+    if request_log.configure_from_env():
+        print(f"📝 Request capture enabled: {os.getenv('REQUEST_LOG_PATH')}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush captured requests on shutdown"""
+    request_log.close()
 
 
 class ChatRequest(BaseModel):
@@ -58,6 +77,24 @@ class ChatResponse(BaseModel):
     conversation_id: Optional[str] = None
 
 
+class RebuildRequest(BaseModel):
+    """Request model for index rebuild endpoint"""
+    chunk_size: int = 600
+    overlap: int = 100
+
+
+def require_admin(token: Optional[str]):
+    """
+    Check the admin token against ADMIN_TOKEN.
+    Admin endpoints are disabled when ADMIN_TOKEN is not set.
+    """
+    expected = os.getenv('ADMIN_TOKEN')
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin API disabled (ADMIN_TOKEN not set)")
+    if not secrets.compare_digest(token or '', expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -71,14 +108,18 @@ async def root():
 @app.get("/health")
 async def health():
     """Detailed health check"""
-    embeddings_exist = os.path.exists('embeddings.npy')
-    metadata_exists = os.path.exists('metadata.json')
+    try:
+        index = get_index_store().current()
+    except Exception:
+        index = None
     
     return {
-        "status": "healthy" if (embeddings_exist and metadata_exists and agent) else "unhealthy",
+        "status": "healthy" if (index and agent) else "unhealthy",
         "agent_initialized": agent is not None,
-        "embeddings_ready": embeddings_exist,
-        "metadata_ready": metadata_exists
+        "embeddings_ready": index is not None,
+        "metadata_ready": index is not None,
+        "index_version": index.version if index else None,
+        "request_log": request_log.stats()
     }
 
 
@@ -93,23 +134,33 @@ async def chat(request: ChatRequest):
     Returns:
         ChatResponse: Agent response
     """
-    if not agent:
-        raise HTTPException(status_code=503, detail="Agent not initialized")
-    
-    if not request.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    record = request_log.start(request.message, request.conversation_id)
     
     try:
-        # Get response from agent
-        response = agent.chat(request.message)
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        
+        if not request.message.strip():
+            raise HTTPException(status_code=400, detail="Message cannot be empty")
+        
+        try:
+            # Get response from agent
+            response = agent.chat(request.message)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"{AGENT_ERROR_PREFIX} {str(e)}")
+        
+        # The agent reports its own failures as text rather than raising
+        error = response if response.startswith(AGENT_ERROR_PREFIX) else None
+        request_log.finish(record, 200, error)
         
         return ChatResponse(
             response=response,
             conversation_id=request.conversation_id
         )
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    except HTTPException as e:
+        request_log.finish(record, e.status_code, e.detail)
+        raise
 
 
 @app.get("/chapters")
@@ -119,6 +170,54 @@ async def get_chapters():
     return {"chapters": get_chapter_list()}
 
 
+@app.get("/admin/index")
+async def index_status(x_admin_token: Optional[str] = Header(None)):
+    """Get the live index version and latest rebuild status"""
+    require_admin(x_admin_token)
+    return get_index_store().status()
+
+
+@app.post("/admin/index/rebuild", status_code=202)
+async def rebuild_index(
+    request: Optional[RebuildRequest] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Start a background index rebuild.
+    The new index is built into a versioned directory, validated and then
+    swapped in atomically; queries keep using the old index until then.
+    
+    Args:
+        request (RebuildRequest): Optional chunking parameters
+        
+    Returns:
+        dict: Rebuild status
+    """
+    require_admin(x_admin_token)
+    request = request or RebuildRequest()
+    
+    if request.chunk_size <= 0 or not 0 <= request.overlap < request.chunk_size:
+        raise HTTPException(status_code=400, detail="Invalid chunk_size or overlap")
+    
+    store = get_index_store()
+    started = store.start_rebuild(
+        book_dir=os.getenv('BOOK_DIR', '../book_content'),
+        chunk_size=request.chunk_size,
+        overlap=request.overlap
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A rebuild is already running")
+    
+    return store.rebuild_status()
+
+
+@app.get("/admin/index/rebuild")
+async def rebuild_status(x_admin_token: Optional[str] = Header(None)):
+    """Get progress of the current or most recent index rebuild"""
+    require_admin(x_admin_token)
+    return get_index_store().rebuild_status()
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -1,29 +1,38 @@
 """
 Script to generate embeddings from book content.
-Run this once to create embeddings.npy and metadata.json files.
+Builds a new versioned index under indexes/ and publishes it atomically,
+so running servers pick it up without a restart. Also refreshes the
+committed embeddings.npy and metadata.json used by fresh deploys.
 """
 
 import os
 from dotenv import load_dotenv
-from utils import process_book_and_create_embeddings
 
-# Load environment variables
+# Load environment variables before index_store reads its settings
 load_dotenv()
 
+from index_store import get_index_store
+
 if __name__ == '__main__':
     try:
-        # Process book and create embeddings
-        embeddings, metadata = process_book_and_create_embeddings(
-            book_dir='../book_content',
-            output_dir='.',
+        store = get_index_store()
+        
+        # Process book, create embeddings and publish a new index version
+        index = store.rebuild(
+            book_dir=os.getenv('BOOK_DIR', '../book_content'),
             chunk_size=600,  # ~600 words per chunk
             overlap=100      # 100 words overlap
         )
         
+        # Refresh the committed copy so git-based deploys ship the new index
+        store.export_legacy(index.version)
+        
         print(f"\n📊 Summary:")
-        print(f"   - Total chunks: {len(metadata)}")
-        print(f"   - Embedding dimensions: {embeddings.shape}")
-        print(f"   - Files created: embeddings.npy, metadata.json")
+        print(f"   - Version: {index.version}")
+        print(f"   - Total chunks: {len(index.metadata)}")
+        print(f"   - Embedding dimensions: {index.embeddings.shape}")
+        print(f"   - Published to: {os.path.join(store.index_dir, index.version)}")
+        print(f"   - Files updated: embeddings.npy, metadata.json (commit these to deploy)")
         
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
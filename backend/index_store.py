@@ -0,0 +1,629 @@
+"""
+Versioned embedding index store for Git Book Agent
+Builds new indexes into versioned directories, validates them and
+hot-swaps the live index without restarting the server
+"""
+
+import os
+import json
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from utils import process_book_and_create_embeddings
+
+
+CURRENT_POINTER = 'CURRENT'
+REBUILD_LOCK = 'REBUILD.lock'
+REBUILD_STATUS = 'REBUILD.json'
+LEGACY_EMBEDDINGS = 'embeddings.npy'
+LEGACY_METADATA = 'metadata.json'
+# Lock files that never got their owner written are stale after this long
+STALE_LOCK_SECONDS = 60
+
+
+class IndexValidationError(ValueError):
+    """Raised when a freshly built index fails validation"""
+
+
+class IndexSnapshot:
+    """
+    Immutable, fully loaded embedding index.
+    A search holds on to one snapshot for its whole duration, so a swap
+    never mixes embeddings from one version with metadata from another.
+    """
+
+    def __init__(self, version: str, embeddings: np.ndarray, metadata: List[Dict]):
+        """
+        Initialize the snapshot.
+
+        Args:
+            version (str): Version name of the index
+            embeddings (np.ndarray): Chunk embeddings, one row per chunk
+            metadata (List[Dict]): Chunk metadata, aligned with embeddings
+        """
+        self.version = version
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.norms = np.linalg.norm(embeddings, axis=1)
+        self.loaded_at = time.time()
+
+        self.embeddings.setflags(write=False)
+        self.norms.setflags(write=False)
+
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Summarize the snapshot for status endpoints.
+
+        Returns:
+            Dict: Version, chunk count and embedding dimensions
+        """
+        return {
+            "version": self.version,
+            "chunks": int(self.embeddings.shape[0]),
+            "dimensions": int(self.embeddings.shape[1]),
+            "loaded_at": _isoformat(self.loaded_at)
+        }
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """Format a unix timestamp as an ISO-8601 UTC string"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _new_version_name() -> str:
+    """Generate a sortable, unique version directory name"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    return f"v{stamp}-{os.getpid()}"
+
+
+def _atomic_write(path: str, text: str):
+    """Write a small file so readers see either the old or the new content"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_index_files(directory: str) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Load embeddings and metadata files from a directory.
+
+    Args:
+        directory (str): Directory containing embeddings.npy and metadata.json
+
+    Returns:
+        Tuple[np.ndarray, List[Dict]]: Embeddings array and metadata list
+    """
+    embeddings = np.load(os.path.join(directory, LEGACY_EMBEDDINGS))
+    with open(os.path.join(directory, LEGACY_METADATA), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    return embeddings, metadata
+
+
+def validate_index(embeddings: np.ndarray, metadata: List[Dict]):
+    """
+    Check that an embeddings/metadata pair is usable for search.
+
+    Args:
+        embeddings (np.ndarray): Chunk embeddings
+        metadata (List[Dict]): Chunk metadata
+
+    Raises:
+        IndexValidationError: If the pair is empty, misaligned or corrupt
+    """
+    if embeddings.ndim != 2 or embeddings.shape[0] == 0 or embeddings.shape[1] == 0:
+        raise IndexValidationError(f"Unexpected embeddings shape: {embeddings.shape}")
+
+    if not isinstance(metadata, list) or len(metadata) != embeddings.shape[0]:
+        raise IndexValidationError(
+            f"Metadata has {len(metadata)} entries but embeddings have {embeddings.shape[0]} rows"
+        )
+
+    if not np.all(np.isfinite(embeddings)):
+        raise IndexValidationError("Embeddings contain NaN or infinite values")
+
+    if np.any(np.linalg.norm(embeddings, axis=1) == 0):
+        raise IndexValidationError("Embeddings contain zero vectors")
+
+    for i, chunk_meta in enumerate(metadata):
+        if not isinstance(chunk_meta, dict) or 'chapter' not in chunk_meta or 'content' not in chunk_meta:
+            raise IndexValidationError(f"Metadata entry {i} is missing chapter or content")
+
+
+class IndexStore:
+    """
+    Holds the live index for one worker process and manages rebuilds.
+
+    Published versions live in INDEX_DIR/<version>/ and the CURRENT pointer
+    file names the live one. The pointer is replaced atomically, and every
+    worker polls it so all workers converge on the new version.
+    """
+
+    def __init__(
+        self,
+        index_dir: Optional[str] = None,
+        keep_versions: Optional[int] = None,
+        check_interval: Optional[float] = None
+    ):
+        """
+        Initialize the store.
+        Unset arguments are read from INDEX_DIR, INDEX_KEEP_VERSIONS and
+        INDEX_CHECK_INTERVAL here rather than at import time, so values
+        from .env are honoured.
+
+        Args:
+            index_dir (str, optional): Directory holding versioned indexes
+            keep_versions (int, optional): Published versions to keep on disk
+            check_interval (float, optional): Seconds between pointer checks
+        """
+        self.index_dir = index_dir or os.getenv('INDEX_DIR', 'indexes')
+        self.keep_versions = (
+            keep_versions if keep_versions is not None
+            else int(os.getenv('INDEX_KEEP_VERSIONS', 3))
+        )
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.getenv('INDEX_CHECK_INTERVAL', 2.0))
+        )
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._last_check = 0.0
+        self._reloading = False
+        self._failed_version: Optional[str] = None
+
+        self._rebuild_status: Dict[str, Any] = {"state": "idle"}
+
+
+    @property
+    def pointer_path(self) -> str:
+        """Path of the CURRENT pointer file"""
+        return os.path.join(self.index_dir, CURRENT_POINTER)
+
+
+    def read_pointer(self) -> Optional[str]:
+        """
+        Read the published version name.
+
+        Returns:
+            Optional[str]: Live version name, or None if nothing is published
+        """
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+            return version or None
+        except FileNotFoundError:
+            return None
+
+
+    def _load_snapshot(self, version: Optional[str]) -> IndexSnapshot:
+        """Load a published version, or the legacy files when none is published"""
+        if version is None:
+            embeddings, metadata = load_index_files('.')
+            return IndexSnapshot('legacy', embeddings, metadata)
+
+        embeddings, metadata = load_index_files(os.path.join(self.index_dir, version))
+        return IndexSnapshot(version, embeddings, metadata)
+
+
+    def _reload_in_background(self, version: str):
+        """Load a newly published version off the request path, then swap"""
+        try:
+            snapshot = self._load_snapshot(version)
+            validate_index(snapshot.embeddings, snapshot.metadata)
+            with self._load_lock:
+                # A rebuild in this process may have published a newer version meanwhile
+                if version != self.read_pointer():
+                    return
+                self._snapshot = snapshot
+            print(f"🔄 Switched to index version: {version}")
+        except Exception as e:
+            self._failed_version = version
+            print(f"❌ Failed to load index version {version}: {e}")
+        finally:
+            self._reloading = False
+
+
+    def current(self) -> IndexSnapshot:
+        """
+        Get the live index snapshot.
+        The first call loads synchronously; afterwards the pointer is polled
+        at most every check_interval seconds and new versions are
+        loaded in a background thread while the old snapshot keeps serving.
+
+        Returns:
+            IndexSnapshot: Live snapshot
+
+        Raises:
+            FileNotFoundError: If no index has been built yet
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load_snapshot(self.read_pointer())
+                    self._last_check = time.monotonic()
+                return self._snapshot
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval and not self._reloading:
+            with self._load_lock:
+                if now - self._last_check >= self.check_interval and not self._reloading:
+                    self._last_check = now
+                    version = self.read_pointer()
+                    if version is not None and version not in (snapshot.version, self._failed_version):
+                        self._reloading = True
+                        threading.Thread(
+                            target=self._reload_in_background,
+                            args=(version,),
+                            daemon=True
+                        ).start()
+
+        return snapshot
+
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Describe the live index and the latest rebuild.
+
+        Returns:
+            Dict: Live index summary and rebuild status
+        """
+        snapshot = self._snapshot
+        return {
+            "live": snapshot.describe() if snapshot else None,
+            "published_version": self.read_pointer(),
+            "rebuild": self.rebuild_status()
+        }
+
+
+    @property
+    def lock_path(self) -> str:
+        """Path of the cross-process rebuild lock file"""
+        return os.path.join(self.index_dir, REBUILD_LOCK)
+
+
+    @property
+    def rebuild_status_path(self) -> str:
+        """Path of the shared rebuild status file"""
+        return os.path.join(self.index_dir, REBUILD_STATUS)
+
+
+    def rebuild_status(self) -> Dict[str, Any]:
+        """
+        Get the progress of the current or most recent rebuild.
+        Read from INDEX_DIR so every worker reports the same status.
+
+        Returns:
+            Dict: Rebuild state, stage, progress and timing
+        """
+        try:
+            with open(self.rebuild_status_path, 'r', encoding='utf-8') as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"state": "idle"}
+
+        # The owner died without recording an outcome
+        if status.get("state") == "running" and self._lock_is_stale():
+            status["state"] = "interrupted"
+        return status
+
+
+    def _set_rebuild_status(self, **changes: Any):
+        """Update the rebuild status and publish it for other workers"""
+        self._rebuild_status = {**self._rebuild_status, **changes}
+        _atomic_write(self.rebuild_status_path, json.dumps(self._rebuild_status, indent=2))
+
+
+    def _lock_is_stale(self) -> bool:
+        """Check whether the rebuild lock is missing or held by a dead process"""
+        try:
+            with open(self.lock_path, 'r', encoding='utf-8') as f:
+                owner = json.load(f)
+        except FileNotFoundError:
+            return True
+        except ValueError:
+            # Owner may still be writing the file
+            try:
+                age = time.time() - os.path.getmtime(self.lock_path)
+            except FileNotFoundError:
+                return True
+            return age > STALE_LOCK_SECONDS
+
+        if owner.get("host") != socket.gethostname():
+            # Cannot check processes on other hosts
+            return False
+        try:
+            os.kill(owner["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+
+    def _acquire_rebuild_lock(self) -> bool:
+        """
+        Take the cross-process rebuild lock.
+        A lock left behind by a crashed process on this host is cleared.
+
+        Returns:
+            bool: True if the lock was taken, False if another rebuild holds it
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._lock_is_stale():
+                    return False
+                try:
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "pid": os.getpid(),
+                    "host": socket.gethostname(),
+                    "acquired_at": _isoformat(time.time())
+                }, f)
+            return True
+        return False
+
+
+    def _release_rebuild_lock(self):
+        """Drop the cross-process rebuild lock"""
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+
+    def build_version(
+        self,
+        book_dir: str = '../book_content',
+        chunk_size: int = 600,
+        overlap: int = 100,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> IndexSnapshot:
+        """
+        Build, validate and publish a new index version.
+        The index is written to a staging directory and only renamed into
+        place once it has been read back and validated, so readers never see
+        a partially written version.
+
+        Args:
+            book_dir (str): Directory containing markdown files
+            chunk_size (int): Words per chunk
+            overlap (int): Overlapping words between chunks
+            progress_callback (Callable, optional): Called with (stage, done, total)
+
+        Returns:
+            IndexSnapshot: The newly published snapshot
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        version = _new_version_name()
+        staging_dir = os.path.join(self.index_dir, f".staging-{version}")
+        version_dir = os.path.join(self.index_dir, version)
+        os.makedirs(staging_dir)
+
+        try:
+            process_book_and_create_embeddings(
+                book_dir=book_dir,
+                output_dir=staging_dir,
+                chunk_size=chunk_size,
+                overlap=overlap,
+                progress_callback=progress_callback
+            )
+
+            if progress_callback:
+                progress_callback('validating', 0, 0)
+            embeddings, metadata = load_index_files(staging_dir)
+            validate_index(embeddings, metadata)
+
+            with open(os.path.join(staging_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": version,
+                    "created_at": _isoformat(time.time()),
+                    "chunks": int(embeddings.shape[0]),
+                    "dimensions": int(embeddings.shape[1]),
+                    "chunk_size": chunk_size,
+                    "overlap": overlap
+                }, f, indent=2)
+
+            os.rename(staging_dir, version_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        if progress_callback:
+            progress_callback('publishing', 0, 0)
+        self.publish(version)
+
+        snapshot = IndexSnapshot(version, embeddings, metadata)
+        with self._load_lock:
+            self._snapshot = snapshot
+        self._prune_old_versions(keep=version)
+        return snapshot
+
+
+    def publish(self, version: str):
+        """
+        Atomically point CURRENT at a version.
+
+        Args:
+            version (str): Version directory name inside index_dir
+        """
+        _atomic_write(self.pointer_path, version)
+
+
+    def export_legacy(self, version: str, directory: str = '.'):
+        """
+        Copy a published version over the legacy embeddings.npy/metadata.json.
+        These are the files committed to git and used when no version has
+        been published, e.g. on a fresh deploy. Each file is swapped in with
+        os.replace, and running servers only read them before a version exists.
+
+        Args:
+            version (str): Version directory name inside index_dir
+            directory (str): Directory holding the legacy files
+        """
+        for filename in (LEGACY_EMBEDDINGS, LEGACY_METADATA):
+            target = os.path.join(directory, filename)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(os.path.join(self.index_dir, version, filename), tmp_path)
+            os.replace(tmp_path, target)
+
+
+    def _prune_old_versions(self, keep: str):
+        """Delete all but the newest keep_versions published versions"""
+        versions = sorted(
+            name for name in os.listdir(self.index_dir)
+            if name.startswith('v') and os.path.isdir(os.path.join(self.index_dir, name))
+        )
+        for name in versions[:-self.keep_versions] if self.keep_versions > 0 else []:
+            if name != keep:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+
+    def _begin_rebuild(self) -> bool:
+        """
+        Take the rebuild lock and mark a rebuild as running.
+
+        Returns:
+            bool: True if the rebuild may proceed, False if one is in progress
+        """
+        if not self._acquire_rebuild_lock():
+            return False
+
+        try:
+            self._rebuild_status = {}
+            self._set_rebuild_status(
+                state="running",
+                stage="starting",
+                done=0,
+                total=0,
+                version=None,
+                error=None,
+                pid=os.getpid(),
+                host=socket.gethostname(),
+                started_at=_isoformat(time.time()),
+                finished_at=None
+            )
+        except Exception:
+            self._release_rebuild_lock()
+            raise
+        return True
+
+
+    def _run_rebuild(self, book_dir: str, chunk_size: int, overlap: int) -> IndexSnapshot:
+        """Run a rebuild while holding the lock, recording status as it goes"""
+        try:
+            def on_progress(stage: str, done: int, total: int):
+                self._set_rebuild_status(stage=stage, done=done, total=total)
+
+            try:
+                snapshot = self.build_version(book_dir, chunk_size, overlap, on_progress)
+            except Exception as e:
+                self._set_rebuild_status(
+                    state="failed",
+                    error=str(e),
+                    finished_at=_isoformat(time.time())
+                )
+                print(f"❌ Index rebuild failed: {e}")
+                raise
+
+            self._set_rebuild_status(
+                state="succeeded",
+                stage="done",
+                version=snapshot.version,
+                finished_at=_isoformat(time.time())
+            )
+            print(f"✅ Index rebuilt and published: {snapshot.version}")
+            return snapshot
+        finally:
+            self._release_rebuild_lock()
+
+
+    def rebuild(
+        self,
+        book_dir: str = '../book_content',
+        chunk_size: int = 600,
+        overlap: int = 100
+    ) -> IndexSnapshot:
+        """
+        Rebuild and publish the index in the calling thread.
+
+        Args:
+            book_dir (str): Directory containing markdown files
+            chunk_size (int): Words per chunk
+            overlap (int): Overlapping words between chunks
+
+        Returns:
+            IndexSnapshot: The newly published snapshot
+
+        Raises:
+            RuntimeError: If another process is already rebuilding
+        """
+        if not self._begin_rebuild():
+            raise RuntimeError("A rebuild is already running")
+        return self._run_rebuild(book_dir, chunk_size, overlap)
+
+
+    def start_rebuild(
+        self,
+        book_dir: str = '../book_content',
+        chunk_size: int = 600,
+        overlap: int = 100
+    ) -> bool:
+        """
+        Start a background rebuild unless one is running in any worker.
+
+        Args:
+            book_dir (str): Directory containing markdown files
+            chunk_size (int): Words per chunk
+            overlap (int): Overlapping words between chunks
+
+        Returns:
+            bool: True if a rebuild was started, False if one is in progress
+        """
+        if not self._begin_rebuild():
+            return False
+
+        def run():
+            try:
+                self._run_rebuild(book_dir, chunk_size, overlap)
+            except Exception:
+                pass  # Already recorded in the rebuild status
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+
+_store: Optional[IndexStore] = None
+_store_lock = threading.Lock()
+
+
+def get_index_store() -> IndexStore:
+    """
+    Get the process-wide index store.
+
+    Returns:
+        IndexStore: Shared store instance
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IndexStore()
+    return _store
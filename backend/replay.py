@@ -0,0 +1,267 @@
+"""
+Replay captured /chat traffic against a running server.
+Reads a request log written by request_log.py and re-sends each question
+at its original pace (or scaled by --speed), then reports throughput,
+latency percentiles and error rates. Latency is measured from each
+request's scheduled send time, so client-side queueing is included.
+
+Start the target server with AGENT_STUB=1 (optionally AGENT_STUB_LOG=<log>)
+so the upstream model is replaced by a local stub.
+
+Usage:
+    python replay.py requests.jsonl --url http://localhost:8000 --speed 4
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from request_log import AGENT_ERROR_PREFIX
+
+
+# Requests that start this far behind schedule are reported as late
+LATE_THRESHOLD_S = 0.1
+
+
+def load_capture(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Load captured records, ordered by arrival time.
+
+    Args:
+        path (str): Request log in JSONL format
+        limit (int, optional): Max number of records to load
+
+    Returns:
+        List[Dict]: Captured records
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+
+    records.sort(key=lambda r: r['ts'])
+    return records[:limit] if limit else records
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (List[float]): Values to summarize
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        Optional[float]: Percentile value, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def send_chat(
+    url: str,
+    record: Dict[str, Any],
+    timeout: float,
+    scheduled: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Send one captured question to the server.
+    Latency is measured from the scheduled send time, so time spent waiting
+    for a free worker counts against the server like it would for a user.
+
+    Args:
+        url (str): Base URL of the server
+        record (Dict): Captured record
+        timeout (float): Request timeout in seconds
+        scheduled (float, optional): perf_counter() time the request was due
+
+    Returns:
+        Dict: Status, latency, queue wait, service time and error (if any)
+    """
+    body = json.dumps({
+        "message": record['question'],
+        "conversation_id": record.get('conversation_id')
+    }).encode('utf-8')
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/chat",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method='POST'
+    )
+
+    start = time.perf_counter()
+    if scheduled is None:
+        scheduled = start
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+            status = response.status
+        error = payload['response'] if payload['response'].startswith(AGENT_ERROR_PREFIX) else None
+    except urllib.error.HTTPError as e:
+        status, error = e.code, e.reason
+    except Exception as e:
+        status, error = 0, str(e)
+
+    end = time.perf_counter()
+    return {
+        "status": status,
+        "latency_ms": (end - scheduled) * 1000,
+        "queue_wait_ms": max(0.0, start - scheduled) * 1000,
+        "service_ms": (end - start) * 1000,
+        "error": error
+    }
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    url: str,
+    speed: float = 1.0,
+    concurrency: int = 64,
+    timeout: float = 60.0
+) -> Dict[str, Any]:
+    """
+    Replay records open-loop, keeping their original inter-arrival gaps.
+
+    Args:
+        records (List[Dict]): Captured records ordered by arrival time
+        url (str): Base URL of the server
+        speed (float): Time compression factor; 0 sends as fast as possible
+        concurrency (int): Max requests in flight
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        Dict: Summary report
+    """
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def run(record: Dict[str, Any], scheduled: float):
+        result = send_chat(url, record, timeout, scheduled)
+        with lock:
+            results.append(result)
+
+    first_ts = records[0]['ts'] if records else 0.0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed > 0:
+                scheduled = start + (record['ts'] - first_ts) / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+            pool.submit(run, record, scheduled)
+
+    elapsed = time.perf_counter() - start
+    return summarize(results, records, elapsed)
+
+
+def summarize(
+    results: List[Dict[str, Any]],
+    records: List[Dict[str, Any]],
+    elapsed: float
+) -> Dict[str, Any]:
+    """
+    Build the replay report.
+
+    Args:
+        results (List[Dict]): Per-request results from send_chat
+        records (List[Dict]): Captured records that were replayed
+        elapsed (float): Wall-clock replay duration in seconds
+
+    Returns:
+        Dict: Throughput, latency percentiles, error rates and status counts
+    """
+    latencies = [r['latency_ms'] for r in results]
+    queue_waits = [r['queue_wait_ms'] for r in results]
+    service_times = [r['service_ms'] for r in results]
+    late = sum(1 for w in queue_waits if w > LATE_THRESHOLD_S * 1000)
+    captured = [r['latency_ms'] for r in records if 'latency_ms' in r]
+    errors = sum(1 for r in results if r['error'] or r['status'] != 200)
+
+    status_counts: Dict[str, int] = {}
+    for r in results:
+        key = str(r['status'])
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+        return {
+            name: (round(percentile(values, pct), 2) if values else None)
+            for name, pct in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))
+        }
+
+    return {
+        "requests": len(results),
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "error_rate": round(errors / len(results), 4) if results else None,
+        "errors": errors,
+        "late_sends": late,
+        "status_counts": status_counts,
+        "latency_ms": latency_summary(latencies),
+        "queue_wait_ms": latency_summary(queue_waits),
+        "service_ms": latency_summary(service_times),
+        "captured_latency_ms": latency_summary(captured)
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """
+    Print a human-readable replay report.
+
+    Args:
+        report (Dict): Report from replay()
+    """
+    print(f"\n{'='*80}")
+    print("📊 REPLAY REPORT")
+    print(f"{'='*80}")
+    print(f"   Requests:    {report['requests']} in {report['duration_s']}s")
+    print(f"   Throughput:  {report['throughput_rps']} req/s")
+    print(f"   Errors:      {report['errors']} (rate {report['error_rate']})")
+    print(f"   Late sends:  {report['late_sends']}")
+    print(f"   Statuses:    {report['status_counts']}")
+    print(f"\n   {'':10}{'replay':>12}{'queue wait':>12}{'service':>12}{'captured':>12}")
+    for name in ("p50", "p90", "p95", "p99", "max"):
+        print(
+            f"   {name:10}{str(report['latency_ms'][name]):>12}"
+            f"{str(report['queue_wait_ms'][name]):>12}"
+            f"{str(report['service_ms'][name]):>12}"
+            f"{str(report['captured_latency_ms'][name]):>12}"
+        )
+    print(f"{'='*80}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay captured /chat traffic against a server")
+    parser.add_argument('log', help="Request log written with REQUEST_LOG_PATH")
+    parser.add_argument('--url', default='http://localhost:8000', help="Base URL of the server")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Time compression factor (2 = twice as fast, 0 = no pacing)")
+    parser.add_argument('--concurrency', type=int, default=64, help="Max requests in flight")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Request timeout in seconds")
+    parser.add_argument('--limit', type=int, help="Only replay the first N requests")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    records = load_capture(args.log, args.limit)
+    if not records:
+        print(f"❌ No requests found in {args.log}")
+    else:
+        print(f"🚀 Replaying {len(records)} requests against {args.url} at {args.speed}x")
+        report = replay(records, args.url, args.speed, args.concurrency, args.timeout)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
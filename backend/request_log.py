@@ -0,0 +1,255 @@
+"""
+Opt-in request capture for Git Book Agent
+Records sampled /chat requests (question, timings, tool calls) as JSONL.
+Records are buffered in memory and written by a background thread, so
+logging never does file I/O on the request path.
+
+Enable by setting REQUEST_LOG_PATH. Optional settings:
+    REQUEST_LOG_SAMPLE_RATE   fraction of requests to record (default 1.0)
+    REQUEST_LOG_BUFFER        max records buffered before dropping (default 10000)
+    REQUEST_LOG_FLUSH_SECONDS max seconds between flushes (default 2.0)
+"""
+
+import os
+import json
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+# Prefix the agent puts on failures it reports as text instead of raising.
+# Lives here so replay.py can detect them without importing the agent.
+AGENT_ERROR_PREFIX = "Error processing message:"
+
+_current_record: ContextVar[Optional[Dict[str, Any]]] = ContextVar('request_log_record', default=None)
+
+
+class RequestLogger:
+    """
+    Buffered, sampled JSONL writer.
+    Records are handed to a bounded queue; when the queue is full they are
+    dropped and counted rather than slowing the request down.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = 1.0,
+        buffer_size: int = 10000,
+        flush_seconds: float = 2.0,
+        batch_size: int = 200
+    ):
+        """
+        Initialize the logger and start its writer thread.
+
+        Args:
+            path (str): JSONL file to append records to
+            sample_rate (float): Fraction of requests to record
+            buffer_size (int): Max records held in memory
+            flush_seconds (float): Max seconds between flushes
+            batch_size (int): Records that trigger an early flush
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._counter_lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def sampled(self) -> bool:
+        """Decide whether the current request should be recorded"""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+
+    def submit(self, record: Dict[str, Any]):
+        """
+        Queue a finished record for writing.
+
+        Args:
+            record (Dict): Record to write
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count_dropped(1)
+
+
+    def _count_dropped(self, n: int):
+        """Add to the dropped counter from any thread"""
+        with self._counter_lock:
+            self.dropped += n
+
+
+    def buffered(self) -> int:
+        """
+        Get the number of records waiting to be written.
+
+        Returns:
+            int: Approximate queue size
+        """
+        return self._queue.qsize()
+
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """Append a batch of records to the log file"""
+        if not batch:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in batch))
+            with self._counter_lock:
+                self.written += len(batch)
+        except OSError as e:
+            self._count_dropped(len(batch))
+            print(f"❌ Failed to write request log: {e}")
+
+
+    def _run(self):
+        """Writer loop: flush on batch size, interval or shutdown"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_seconds
+
+        while not self._stop.is_set() or not self._queue.empty():
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_seconds
+
+        self._write(batch)
+
+
+    def close(self, timeout: float = 5.0):
+        """
+        Flush buffered records and stop the writer thread.
+
+        Args:
+            timeout (float): Max seconds to wait for the final flush
+        """
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_logger: Optional[RequestLogger] = None
+
+
+def configure_from_env() -> Optional[RequestLogger]:
+    """
+    Create the process-wide logger if REQUEST_LOG_PATH is set.
+
+    Returns:
+        Optional[RequestLogger]: Logger, or None if capture is disabled
+    """
+    global _logger
+    path = os.getenv('REQUEST_LOG_PATH')
+    if path and _logger is None:
+        _logger = RequestLogger(
+            path=path,
+            sample_rate=float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 1.0)),
+            buffer_size=int(os.getenv('REQUEST_LOG_BUFFER', 10000)),
+            flush_seconds=float(os.getenv('REQUEST_LOG_FLUSH_SECONDS', 2.0))
+        )
+    return _logger
+
+
+def close():
+    """Flush and stop the process-wide logger, if any"""
+    global _logger
+    if _logger is not None:
+        _logger.close()
+        _logger = None
+
+
+def start(question: str, conversation_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Begin recording a request if capture is enabled and it is sampled.
+
+    Args:
+        question (str): User's question
+        conversation_id (str, optional): Conversation id from the request
+
+    Returns:
+        Optional[Dict]: In-progress record, or None if not recorded
+    """
+    if _logger is None or not _logger.sampled():
+        return None
+
+    record = {
+        "ts": time.time(),
+        "question": question,
+        "conversation_id": conversation_id,
+        "tool_calls": [],
+        "_start": time.perf_counter()
+    }
+    _current_record.set(record)
+    return record
+
+
+def record_tool_call(name: str, duration: float):
+    """
+    Attach a tool call to the request being recorded, if any.
+
+    Args:
+        name (str): Tool name
+        duration (float): Tool run time in seconds
+    """
+    record = _current_record.get()
+    if record is not None:
+        record["tool_calls"].append({"name": name, "ms": round(duration * 1000, 2)})
+
+
+def finish(record: Optional[Dict[str, Any]], status: int, error: Optional[str] = None):
+    """
+    Complete a record and hand it to the writer.
+
+    Args:
+        record (Dict, optional): Record returned by start()
+        status (int): HTTP status code of the response
+        error (str, optional): Error detail for failed requests
+    """
+    _current_record.set(None)
+    if record is None or _logger is None:
+        return
+
+    latency_ms = (time.perf_counter() - record.pop("_start")) * 1000
+    tool_ms = sum(call["ms"] for call in record["tool_calls"])
+    record.update({
+        "status": status,
+        "latency_ms": round(latency_ms, 2),
+        "model_ms": round(max(0.0, latency_ms - tool_ms), 2),
+        "error": error
+    })
+    _logger.submit(record)
+
+
+def stats() -> Optional[Dict[str, Any]]:
+    """
+    Get capture counters for health checks.
+
+    Returns:
+        Optional[Dict]: Written/dropped counts, or None if capture is disabled
+    """
+    if _logger is None:
+        return None
+    return {
+        "path": _logger.path,
+        "sample_rate": _logger.sample_rate,
+        "written": _logger.written,
+        "dropped": _logger.dropped,
+        "buffered": _logger.buffered()
+    }
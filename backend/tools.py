@@ -8,6 +8,42 @@ import json
 from typing import List, Dict, Any
 import google.generativeai as genai
 import os
+from index_store import get_index_store
+
+
+def rank_book_content(query_vec: np.ndarray, top_k: int = 3) -> str:
+    """
+    Find the book chunks most similar to a query embedding.
+    
+    Args:
+        query_vec (np.ndarray): Query embedding
+        top_k (int): Number of chunks to return
+        
+    Returns:
+        str: Relevant book content chunks with metadata
+    """
+    # Take one snapshot so a concurrent index swap cannot mix versions
+    index = get_index_store().current()
+    embeddings = index.embeddings
+    metadata = index.metadata
+    
+    # Calculate cosine similarity
+    similarities = np.dot(embeddings, query_vec) / (
+        index.norms * np.linalg.norm(query_vec)
+    )
+    
+    # Get most relevant chunks
+    top_indices = np.argsort(similarities)[-top_k:][::-1]
+    
+    # Build context from top chunks
+    context_parts = []
+    for idx in top_indices:
+        chunk_meta = metadata[int(idx)]
+        context_parts.append(
+            f"[Chapter: {chunk_meta['chapter']}]\n{chunk_meta['content']}\n"
+        )
+    
+    return "\n---\n".join(context_parts)
 
 
 def search_book_content(query: str) -> str:
@@ -22,10 +58,8 @@ def search_book_content(query: str) -> str:
         str: Relevant book content chunks with metadata
     """
     try:
-        # Load embeddings and metadata
-        embeddings = np.load('embeddings.npy')
-        with open('metadata.json', 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        # Fail fast before calling Gemini if no index is available
+        get_index_store().current()
         
         # Configure Gemini API
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
@@ -37,24 +71,7 @@ def search_book_content(query: str) -> str:
             task_type="retrieval_query"
         )['embedding']
         
-        # Calculate cosine similarity
-        query_vec = np.array(query_embedding)
-        similarities = np.dot(embeddings, query_vec) / (
-            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vec)
-        )
-        
-        # Get top 3 most relevant chunks
-        top_indices = np.argsort(similarities)[-3:][::-1]
-        
-        # Build context from top chunks
-        context_parts = []
-        for idx in top_indices:
-            chunk_meta = metadata[int(idx)]
-            context_parts.append(
-                f"[Chapter: {chunk_meta['chapter']}]\n{chunk_meta['content']}\n"
-            )
-        
-        return "\n---\n".join(context_parts)
+        return rank_book_content(np.array(query_embedding))
         
     except FileNotFoundError:
         return "Error: Embeddings not found. Please run the embedding creation script first."
@@ -7,7 +7,7 @@ import re
 import json
 import numpy as np
 import google.generativeai as genai
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 
 
 def read_markdown_files(book_dir: str = '../book_content') -> List[Dict[str, str]]:
@@ -74,13 +74,19 @@ def chunk_text(text: str, chunk_size: int = 600, overlap: int = 100) -> List[str
     return chunks
 
 
-def create_embeddings(texts: List[str], api_key: str) -> np.ndarray:
+def create_embeddings(
+    texts: List[str],
+    api_key: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> np.ndarray:
     """
     Generate embeddings for a list of texts using Gemini API.
     
     Args:
         texts (List[str]): List of text chunks to embed
         api_key (str): Gemini API key
+        progress_callback (Callable, optional): Called with (done, total)
+            after each embedding is created
         
     Returns:
         np.ndarray: Array of embeddings
@@ -97,6 +103,9 @@ def create_embeddings(texts: List[str], api_key: str) -> np.ndarray:
             task_type="retrieval_document"
         )
         embeddings.append(result['embedding'])
+        
+        if progress_callback:
+            progress_callback(i + 1, len(texts))
     
     return np.array(embeddings)
 
@@ -105,7 +114,8 @@ def process_book_and_create_embeddings(
     book_dir: str = '../book_content',
     output_dir: str = '.',
     chunk_size: int = 600,
-    overlap: int = 100
+    overlap: int = 100,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None
 ) -> Tuple[np.ndarray, List[Dict]]:
     """
     Process entire book: read, chunk, and create embeddings.
@@ -115,6 +125,8 @@ def process_book_and_create_embeddings(
         output_dir (str): Directory to save embeddings and metadata
         chunk_size (int): Words per chunk
         overlap (int): Overlapping words between chunks
+        progress_callback (Callable, optional): Called with (stage, done, total)
+            as the build advances through reading, chunking, embedding and saving
         
     Returns:
         Tuple[np.ndarray, List[Dict]]: Embeddings array and metadata list
@@ -123,13 +135,19 @@ def process_book_and_create_embeddings(
     print("PROCESSING BOOK AND CREATING EMBEDDINGS")
     print("=" * 80)
     
+    def report(stage: str, done: int = 0, total: int = 0):
+        if progress_callback:
+            progress_callback(stage, done, total)
+    
     # Read all chapters
     print("\n1. Reading markdown files...")
+    report('reading')
     chapters = read_markdown_files(book_dir)
     print(f"   Found {len(chapters)} chapters")
     
     # Chunk all content
     print("\n2. Chunking content...")
+    report('chunking')
     all_chunks = []
     metadata = []
     
@@ -155,10 +173,15 @@ def process_book_and_create_embeddings(
     if not api_key:
         raise ValueError("GEMINI_API_KEY not found in environment")
     
-    embeddings = create_embeddings(all_chunks, api_key)
+    embeddings = create_embeddings(
+        all_chunks,
+        api_key,
+        progress_callback=lambda done, total: report('embedding', done, total)
+    )
     
     # Save to disk
     print("\n4. Saving to disk...")
+    report('saving')
     embeddings_path = os.path.join(output_dir, 'embeddings.npy')
     metadata_path = os.path.join(output_dir, 'metadata.json')
     